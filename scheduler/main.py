@@ -1,12 +1,36 @@
 #!/usr/bin/env python3
 import sys, os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from typing import BinaryIO, Dict, List, NoReturn, Optional, Union
-import re
 import igraph
 import json
+import numpy as np
 import networkx as nx
 # import matplotlib.pyplot as plt
-from networkx.readwrite import json_graph
+
+try:
+    # Optional, faster json encoding of the subgraphs, falls back to `json`.
+    import orjson
+except ImportError:
+    orjson = None
+
+# The scheduler runs several jobs at once, so each job's writers share
+# one small process pool instead of taking every core.
+_MAX_WRITE_WORKERS = 2
+# Fewer jobs than this are written in process, a pool isn't worth starting.
+_MIN_POOL_JOBS = 16
+
+# Order of the values returned by `find_topological_and_centrality_properties`.
+_PROPERTY_HEADINGS = (
+    "eigen_vector_centrality",
+    "betweenness_centrality",
+    "closeness_centrality",
+    "probability_degree_distribution",
+    "clustering_coefficient",
+    "neighborhood_connectivity",
+    "current_degree",
+)
 
 class CommunityFinder:
     """
@@ -31,17 +55,20 @@ class CommunityFinder:
 
         self._leaf_communities_edgelist: Dict[str, List[ List[str, str] ] ] = {}
         self._root_communities_edgelist: Dict[str, List[ List[str, str] ] ] = {}
-        self.communities_subgraph_inclusive: Dict[str, igraph.Graph] = {}
+        # Names of the vertices of every subgraph in the hierarchy, the subgraphs
+        # themselves are rebuilt from the parent graph when needed, see `get_subgraph`.
+        self._subgraph_vertex_sets: Dict[str, List[str]] = {}
+        self._vertex_name_index: Dict[str, int] = {}
+        # Per vertex properties of every subgraph with at least 3 vertices, keyed like
+        # `_subgraph_vertex_sets` with '0' for the parent graph, see `compute_vertex_properties`.
+        # Only filled when `parse` is called with `cache_properties`, emptied by `write_subgraphs`.
+        self._centrality_cache: Dict[str, Dict[str, List[float]]] = {}
+        self._cache_properties: bool = False
+        # Vertex coordinates of the svg renders, shared by `write_leaf_networks` and `write_subgraphs`.
+        self._layout_cache: Dict[str, List[List[float]]] = {}
+        # Started by the first writer that needs it, see `_emit_subgraphs` and `close`.
+        self._executor: Optional[ProcessPoolExecutor] = None
         self.tree: Dict[str, List[ Dict[str, List[str] ]]] = dict()
-        self._property_headings_list : List[str] = [
-            "eigen_vector_centrality",
-            "betweenness_centrality",
-            "closeness_centrality",
-            "probability_degree_distribution",
-            "clustering_coefficient",
-            "neighborhood_connectivity",
-            "current_degree",
-        ]
 
         if isinstance(output_format, str) and output_format.lower() in ["edgelist", "json"]:
             self.output_format = output_format
@@ -64,7 +91,12 @@ class CommunityFinder:
     def get_graph(self) -> igraph.Graph:
         return self._graph
 
-    def parse(self, subgraph_min_vertices=None, key_regulator_bin_width : int = 50 , cf_algo: str = None) -> Dict[str, igraph.Graph]:
+    def parse(self, subgraph_min_vertices=None, key_regulator_bin_width : int = 50 , cf_algo: str = None, cache_properties: bool = False) -> Dict[str, igraph.Graph]:
+        """
+        Finds the communities recursively, pass `cache_properties` when
+        `write_subgraphs` will be called so the vertex properties computed
+        along the way are reused for its property plots.
+        """
 
         if isinstance(subgraph_min_vertices, int):
             self.subgraph_min_vertices = subgraph_min_vertices
@@ -84,11 +116,27 @@ class CommunityFinder:
                 "Key Regulator bin width should be an integer."
             )
 
+        # A running writer pool holds the previous parent graph.
+        self.close()
+
         self._leaf_communities_edgelist.clear()
+        self._subgraph_vertex_sets.clear()
+        self._centrality_cache.clear()
+        self._cache_properties = cache_properties
+        self._layout_cache.clear()
+        self._vertex_name_index = { name : index for index, name in enumerate(self._graph.vs["_nx_name"]) }
 
         _degrees = self._graph.degree()
-        _vertex_ids = sorted( range( len(_degrees) ) , key = lambda sub: _degrees[sub])[-key_regulator_bin_width:]
-        self._max_degree_nodes : Dict[ str , List[ int ] ] = { self._graph.vs[i]["_nx_name"]:[self._graph.vs[i].degree()] for i in _vertex_ids}
+        # Only the top `key_regulator_bin_width` degrees are needed, so partition instead of sorting every vertex.
+        # Ranking by degree*|V| + id breaks ties towards the higher vertex id, same as a stable sort by degree.
+        _bin_width = min(key_regulator_bin_width, len(_degrees))
+        _vertex_ids = []
+        if _bin_width > 0:
+            _rank = np.asarray(_degrees, dtype=np.int64) * len(_degrees) + np.arange(len(_degrees), dtype=np.int64)
+            _top_ranks = np.sort(_rank[np.argpartition(_rank, -_bin_width)[-_bin_width:]])
+            _vertex_ids = (_top_ranks % len(_degrees)).tolist()
+        _names = self._graph.vs["_nx_name"]
+        self._max_degree_nodes : Dict[ str , List[ int ] ] = { _names[i]:[_degrees[i]] for i in _vertex_ids}
 
         # A rather unusual data dictionary, containing a dictionary of vertice names as keys
         # a list of just one integer which is that node's degree,
@@ -110,6 +158,7 @@ class CommunityFinder:
         }
 
         self.key_regulators = self._max_degree_nodes.copy()
+        self._kr_set = set(self.key_regulators)
         
         if cf_algo is not None and isinstance(cf_algo, str):
             self.cf_algo = cf_algo # This maybe used somewhere in the class so lets make it a class variable.
@@ -117,6 +166,15 @@ class CommunityFinder:
                 self.tree['root']['cf_algo'] = 'Louvain'
                 sys.stdout.write(f"\nUsing the faster Louvain's method (a.k.a community_multilevel).\n")
                 self.find_communities_recursive(self._graph, tree = self.tree['root'], method=0)
+            elif cf_algo == 'louvain_parallel':
+                # Optional and heavy to import, so only loaded when this method is picked.
+                try:
+                    import networkit
+                except ImportError:
+                    raise ImportError("The parallel Louvain method requires networkit to be installed.")
+                self.tree['root']['cf_algo'] = 'Parallel Louvain'
+                sys.stdout.write(f"\nUsing the parallel Louvain's method (networkit PLM).\n")
+                self.find_communities_recursive(self._graph, tree = self.tree['root'], method=2)
             elif cf_algo == 'leading_eigenvector':
                 self.tree['root']['cf_algo'] = 'Leading eigenvector'
                 sys.stdout.write(f"\nUsing the leading eigenvector method since |V|.")
@@ -127,8 +185,6 @@ class CommunityFinder:
             sys.stdout.write(f"\n\nUsing the leading louvian method since no algo is defined.")
             self.find_communities_recursive(self._graph, tree = self.tree['root'], method=0)
 
-        l = self.communities_subgraph_inclusive
-
         # Edgelist not required.
         _merged_dict = self._root_communities_edgelist.copy()
         _merged_dict.update(self._leaf_communities_edgelist)
@@ -137,23 +193,24 @@ class CommunityFinder:
         
         return self._leaf_communities_edgelist
 
+    @staticmethod
+    def _named_edgelist(graph: igraph.Graph, v_name_type: str = '_nx_name') -> List[List[str]]:
+        # Pull the whole name vector once rather than one vertex attribute per edge end.
+        names = graph.vs[v_name_type]
+        return [ [ names[source], names[target] ] for source, target in graph.get_edgelist() ]
+
     def has_cycles(self, graph: igraph.Graph):
-        if isinstance(graph, igraph.Graph):
-            graph = nx.Graph(graph.get_edgelist())
-        try:
-            nx.find_cycle(graph)
-            return True
-        except nx.NetworkXNoCycle:
-            return False
+        # A forest with c components has exactly |V| - c edges,
+        # any edge beyond that closes a cycle.
+        return graph.ecount() > graph.vcount() - len(graph.connected_components())
     
     def check_star_topology(self, graph: igraph.Graph):
 
-        _vs_count = len(graph.vs)
-        _es_count = len(graph.vs)
+        _vs_count = graph.vcount()
 
         # Number of edges should be equal
         # to (Number of vertices - 1)
-        if _es_count != ( _vs_count - 1):
+        if graph.ecount() != ( _vs_count - 1):
             return False
     
         # a single node is termed as a bus topology
@@ -161,41 +218,19 @@ class CommunityFinder:
             return True
     
         vertex_degrees = graph.degree()
-    
-        # countCentralNodes stores the count of nodes
-        # with degree V - 1, which should be equal to 1
-        # in case of star topology
-        # countCentralNodes = 0
-        # centralNode = 0
-    
-        central_nodes = [ 1 if degree == _vs_count-1 else 0 for degree in vertex_degrees]
 
-        # there should be only one central node
-        # in the star topology
-        if (sum(central_nodes) != 1):
-            return False
-    
-        # for i in range(1, V + 1):
-        #     # except for the central node
-        #     # check if all other nodes have
-        #     # degree 1, if not return false
-        #     if (i == centralNode):
-        #         continue
-        #     if (vertexDegree[i] != 1):
-        #         return False
-    
-        # if all three necessary
-        # conditions as discussed,
-        # satisfy return true
-        return True
+        # there should be a central node with degree V - 1
+        # and every other node should have degree 1,
+        # with two nodes both of them are central.
+        return max(vertex_degrees) == _vs_count - 1 and vertex_degrees.count(1) >= _vs_count - 1
 
     def find_communities_recursive(self, graph: igraph.Graph, depth: Union[str, None] = None, tree = None, method : int = 0) -> None:
 
         if depth is not None:
-            self.communities_subgraph_inclusive[depth] = graph.copy()
+            self._subgraph_vertex_sets[depth] = graph.vs["_nx_name"]
         
         # Tree setting spot.
-        _key_reg_vertex = [ [ i.index,i["_nx_name"] ] for i in graph.vs if i["_nx_name"] in self.key_regulators.keys()]
+        _key_reg_vertex = [ [ index, name ] for index, name in enumerate(graph.vs["_nx_name"]) if name in self._kr_set ]
 
         for _, name in _key_reg_vertex:
             # This will capture the maximum depth for each keyreg in time.
@@ -205,18 +240,20 @@ class CommunityFinder:
 
         l = dict()
 
+        # Computed for every vertex once here, so `write_subgraphs` doesn't have to do it again.
+        _properties = None
+        if self._cache_properties and graph.vcount() >= 3:
+            _properties = self.compute_vertex_properties(graph)
+            self._centrality_cache['0' if depth is None else depth] = _properties
 
         mathematical_properties = self.find_topological_and_centrality_properties(
             graph,
             [ i[0] for i in _key_reg_vertex ],
+            _properties,
         )
         
         for vertex_id, vertex_name in _key_reg_vertex:
-            l[vertex_name] = dict()
-            _index = 0
-            for value in mathematical_properties[vertex_id]:
-                l[vertex_name][self._property_headings_list[_index]] = value
-                _index += 1
+            l[vertex_name] = dict(zip(_PROPERTY_HEADINGS, mathematical_properties[vertex_id]))
 
         tree['lineage'] = '0' if depth is None else depth
         tree['current_depth'] = tree['lineage'].count('_') + 1
@@ -226,31 +263,40 @@ class CommunityFinder:
         tree['name'] = 'root' if depth is None else depth.split('_')[-1]
         
 
+        _vertex_count = graph.vcount()
+
         # Implement motif discovery here.
         if not self.has_cycles(graph):
             tree['is_leaf_node'] = True
             return
 
-        if len(graph.vs) <= self.subgraph_min_vertices:
-            _edg_list = [ [ graph.vs[edge]["_nx_name"] for edge in line] for line in graph.get_edgelist() ]
+        if _vertex_count <= self.subgraph_min_vertices:
+            _edg_list = self._named_edgelist(graph)
             if len(_edg_list) > 1:
                 self._leaf_communities_edgelist[depth] = _edg_list
                 tree['is_leaf_node'] = True
             return
 
         if depth is not None:
-            _edg_list = [ [ graph.vs[edge]["_nx_name"] for edge in line] for line in graph.get_edgelist() ]
+            _edg_list = self._named_edgelist(graph)
             self._root_communities_edgelist[f"0_{depth}"] = _edg_list
 
+        # No split of a complete graph has positive modularity, so
+        # the detection below would only return the graph itself.
+        if graph.is_simple() and graph.ecount() == _vertex_count * (_vertex_count - 1) // 2:
+            return
+
         if method == 1:
             # print("Using leading eigenvector method.", flush=True)
             communities = list(graph.community_leading_eigenvector( ))
         elif method == 0:
             # print("Using Louvain's method.", flush=True)
             communities = list(graph.community_multilevel())
+        elif method == 2:
+            communities = self.community_plm(graph)
 
-        for vertices in communities:
-            if len(vertices) == len(graph.vs):communities.remove(vertices)
+        # A community spanning the whole graph is no split at all.
+        communities = [ vertices for vertices in communities if len(vertices) != _vertex_count ]
 
         for cg_index, community_vertices in enumerate(communities,1):
             # Tree Stuff
@@ -273,9 +319,59 @@ class CommunityFinder:
             # Tree Stuff.
             tree['children'].append(_c_tree)
 
-    def find_topological_and_centrality_properties(self, graph: igraph.Graph , vertex_indices: List[int] ) -> Dict [int, List[float]]:
+    def community_plm(self, graph: igraph.Graph) -> List[List[int]]:
+        """
+        Finds the communities of a graph using networkit's parallel
+        Louvain method (PLM), in the same list of vertex id lists
+        format as `igraph.VertexClustering`.
+        """
+        import networkit as nk
+
+        _nk_graph = nk.Graph(graph.vcount())
+        if graph.ecount() > 0:
+            _sources, _targets = np.ascontiguousarray(np.asarray(graph.get_edgelist(), dtype=np.uint64).T)
+            _nk_graph.addEdges((_sources, _targets))
+
+        _partition = nk.community.PLM(_nk_graph, refine=True, par='balanced').run().getPartition()
+        _partition.compact()
+
+        communities: List[List[int]] = [[] for _ in range(_partition.numberOfSubsets())]
+        for vertex_id, community_id in enumerate(_partition.getVector()):
+            communities[community_id].append(vertex_id)
+        return communities
+
+    def compute_vertex_properties(self, graph: igraph.Graph) -> Dict[str, List[float]]:
+        """
+        Finds the topological and centrality properties of every vertex
+        of a graph, keyed by the names in `_PROPERTY_HEADINGS`.
+        """
+        vertice_count = graph.vcount()
+        _scale = ( (vertice_count-1)*(vertice_count-2) ) / 2
+
+        _degrees = graph.degree()
+        _degrees_arr = np.asarray(_degrees, dtype=np.int32)
+        _degree_counts = Counter(_degrees)
+
+        return {
+            "eigen_vector_centrality" : [ i / _scale for i in graph.evcent() ],
+            "betweenness_centrality" : [ i / _scale for i in graph.betweenness() ],
+            "closeness_centrality" : graph.closeness(),
+            "probability_degree_distribution" : [ _degree_counts[i] / vertice_count for i in _degrees ],
+            "clustering_coefficient" : graph.transitivity_local_undirected(),
+            "neighborhood_connectivity" : [ _degrees_arr[nb].sum()/len(nb) if nb else 0 for nb in graph.get_adjlist() ],
+            "current_degree" : _degrees,
+        }
+
+    def find_topological_and_centrality_properties(
+        self,
+        graph: igraph.Graph,
+        vertex_indices: List[int],
+        properties: Optional[Dict[str, List[float]]] = None,
+    ) -> Dict [int, List[float]]:
         """
         Finds the topological and centrality properties of a vertex.
+        If the `compute_vertex_properties` result for the graph is passed
+        as `properties` the values are looked up instead of computed.
         """
         _output: Dict[int, List[float]] = dict()
         
@@ -286,7 +382,14 @@ class CommunityFinder:
                 _output[index] = [-1,-1,-1,-1,-1,-1,-1]
             return _output
 
-        
+        # Nothing to compute when this subgraph holds no key regulators.
+        if not vertex_indices:
+            return _output
+
+        if properties is not None:
+            for vertex_index in vertex_indices:
+                _output[vertex_index] = [ properties[heading][vertex_index] for heading in _PROPERTY_HEADINGS ]
+            return _output
 
         # See: https://igraph.org/python/doc/api/igraph._igraph.GraphBase.html#eigenvector_centrality
         _eigen_vector_centrality = graph.evcent()
@@ -294,35 +397,43 @@ class CommunityFinder:
         # See: https://igraph.org/python/doc/api/igraph._igraph.GraphBase.html#betweenness
         # Also see: https://en.wikipedia.org/wiki/Betweenness_centrality#Definition
         # The value is scaled by dividing the centrality value by total number of vertex pairs in the graph.
-        _betweenness_centrality_arr = graph.betweenness()
+        # Only the key regulator vertices are needed, the results are in the order of `vertex_indices`.
+        _betweenness_centrality_arr = graph.betweenness(vertices=vertex_indices)
 
 
         # See: https://igraph.org/python/doc/api/igraph._igraph.GraphBase.html#closeness
-        _closeness_centrality = graph.closeness()
+        _closeness_centrality = graph.closeness(vertices=vertex_indices)
 
         # We find the degree of current node then find the number
         # of occurrences of that degree in the list of degrees of all nodes.
         # Then we divide the above number with the length of all distinct degrees
         # present in the graph.
         _degrees = graph.degree()
+        _degrees_arr = np.asarray(_degrees, dtype=np.int32)
+        _degree_counts = Counter(_degrees)
 
 
         # See: https://igraph.org/python/doc/api/igraph._igraph.GraphBase.html#transitivity_local_undirected
-        _clustering_coeff = graph.transitivity_local_undirected()
+        _clustering_coeff = graph.transitivity_local_undirected(vertices=vertex_indices)
 
         # See: https://www.centiserver.org/centrality/Neighborhood_Connectivity/
-
-
-        for vertex_index in vertex_indices:
-            _neighborhood = graph.neighbors(vertex_index)
+        _adjacency = graph.get_adjlist()
+
+        for vertex_index, _betweenness, _closeness, _clustering in zip(
+            vertex_indices,
+            _betweenness_centrality_arr,
+            _closeness_centrality,
+            _clustering_coeff,
+        ):
+            _neighborhood = _adjacency[vertex_index]
             
             _output[vertex_index] = [
                 _eigen_vector_centrality[vertex_index]/( ( (vertice_count-1)*(vertice_count-2) ) / 2 ), # Eigenvector Centrality
-                _betweenness_centrality_arr[vertex_index] / ( ( (vertice_count-1)*(vertice_count-2) ) / 2 ), # Betweenness Centrality
-                _closeness_centrality[vertex_index], # Closeness Centrality
-                _degrees.count( _degrees[vertex_index] ) / len(_degrees), # Probability Degree Distribution
-                _clustering_coeff[vertex_index], # Clustering Coefficient
-                sum([graph.vs[vid].degree() for vid in _neighborhood ])/len(_neighborhood), # Neighborhood Connectivity
+                _betweenness / ( ( (vertice_count-1)*(vertice_count-2) ) / 2 ), # Betweenness Centrality
+                _closeness, # Closeness Centrality
+                _degree_counts[ _degrees[vertex_index] ] / vertice_count, # Probability Degree Distribution
+                _clustering, # Clustering Coefficient
+                _degrees_arr[_neighborhood].sum()/len(_neighborhood) if _neighborhood else 0, # Neighborhood Connectivity
                 _degrees[vertex_index], # Degree at this level.
             ]
         
@@ -338,17 +449,16 @@ class CommunityFinder:
                 print("Loading network from json file is not yet supported.", flush=True)
                 raise NotImplementedError
             elif format == 'csv' or format == 'tsv':
+                # The first edge is enough to tell the delimiter, no need to scan the whole file.
                 with open(filePath, 'r') as f:
-                    text = f.read()
-                    tsv_l = len(re.findall(r'.*?\t.*\s{1}', text))
-                    csv_l = len(re.findall(r'.*?,.*\s{1}', text))
-
-                    if tsv_l > csv_l:
-                        print("Loading network from tsv file.")
-                        self._graph = nx.read_edgelist(filePath, comments="#" , delimiter="\t")
-                    else:
-                        print("Loading network from csv file.")
-                        self._graph = nx.read_edgelist(filePath, comments="#" , delimiter=",")
+                    line = next((l for l in f if l.strip() and not l.startswith('#')), '')
+
+                if line.count('\t') > line.count(','):
+                    print("Loading network from tsv file.")
+                    self._graph = self._read_edgelist(filePath, delimiter="\t")
+                else:
+                    print("Loading network from csv file.")
+                    self._graph = self._read_edgelist(filePath, delimiter=",")
             else:
                 print("Unknown file format.")
                 raise Exception("Unknown file format.")
@@ -357,7 +467,6 @@ class CommunityFinder:
             # _json_file_obj.write(_json_data)
             # _json_file_obj.flush()
             # _json_file_obj.close()
-            self._graph = igraph.Graph.from_networkx(self._graph)
 
         except IOError:
             sys.stderr.write(
@@ -365,12 +474,45 @@ class CommunityFinder:
             )
             raise
 
+    @staticmethod
+    def _read_edgelist(filePath: str, delimiter: str) -> igraph.Graph:
+        """
+        Reads a delimited edgelist straight into an undirected `igraph.Graph`,
+        keeping vertex names under `_nx_name` and skipping `#` comments,
+        like `nx.read_edgelist` followed by `igraph.Graph.from_networkx` did.
+        """
+        def _edges():
+            with open(filePath, 'r') as f:
+                for line in f:
+                    columns = line.split('#', 1)[0].strip().split(delimiter)
+                    if len(columns) >= 2:
+                        yield columns[0], columns[1]
+
+        graph = igraph.Graph.TupleList(_edges(), directed=False, vertex_name_attr="_nx_name")
+        # networkx.Graph merged repeated edges but kept self loops.
+        graph.simplify(multiple=True, loops=False)
+        return graph
+
+    def get_subgraph(self, depth: str) -> igraph.Graph:
+        """
+        Rebuilds the subgraph found at `depth` from the parent graph,
+        depth '0' being the parent graph itself.
+        """
+        if depth == '0':
+            return self._graph
+        return self._graph.induced_subgraph(self._subgraph_vertex_ids(depth))
+
+    def _subgraph_vertex_ids(self, depth: str) -> Optional[List[int]]:
+        # Parent graph vertex ids of the subgraph at `depth`, None for the parent graph itself.
+        if depth == '0':
+            return None
+        return [ self._vertex_name_index[name] for name in self._subgraph_vertex_sets[depth] ]
+
     def genrate_edgelist(self, v_name_type: str = '_nx_name'):
         if self._leaf_communities_edgelist == {}:
             self.parse()
-        for order, subgraph in self._leaf_communities_edgelist.items():
-            l = self._graph.vs[0]
-            yield order, [ [self._graph.vs[edge][v_name_type] for edge in line] for line in subgraph.get_edgelist() ]
+        for order in self._leaf_communities_edgelist.keys():
+            yield order, self._named_edgelist(self.get_subgraph(order), v_name_type)
 
     def write_leaf_networks(self, base_dir : str = "./", format: str = None ) -> None:
         # If no output type is specified then fallback to class default.
@@ -378,209 +520,224 @@ class CommunityFinder:
 
         _dir = os.path.join(base_dir, "leaf_networks")
     
-        if not os.path.exists(_dir):os.makedirs(_dir)
-        
+        os.makedirs(_dir, exist_ok=True)
+
         # JSON will always be rendered anyways as it's use for displaying the interactive subgraphs.
-        for filename, sub_graph_edgelist in self._leaf_communities_edgelist.items():
-            g_sub = nx.Graph(sub_graph_edgelist)
-            json_data = json.dumps(json_graph.node_link_data(g_sub))
-            __dir = os.path.join(_dir, "leaf_nodes_json")
-            
-            try:
-                os.mkdir(__dir)
-            except FileExistsError:
-                pass
-
-            json_file_obj = open(os.path.join(__dir,f"{filename}.json"),"w")
-            json_file_obj.write(json_data)
-            json_file_obj.flush()
-            json_file_obj.close()
-        
+        _json_dir = os.path.join(_dir, "leaf_nodes_json")
+        os.makedirs(_json_dir, exist_ok=True)
+
+        _tsv_dir = None
         if format == "edgelist":
-            __dir = os.path.join(_dir, "leaf_nodes_edgelist")
-                
-            try:os.mkdir(__dir)
-            except FileExistsError:pass
+            _tsv_dir = os.path.join(_dir, "leaf_nodes_edgelist")
+            os.makedirs(_tsv_dir, exist_ok=True)
+
+        _svg_dir = os.path.join(_dir, "leaf_nodes_svg_render")
+        os.makedirs(_svg_dir, exist_ok=True)
+
+        _jobs = []
+        for filename in self._leaf_communities_edgelist.keys():
+            _jobs.append((
+                self._subgraph_vertex_ids(filename),
+                os.path.join(_json_dir, f"{filename}.json"),
+                None if _tsv_dir is None else os.path.join(_tsv_dir, f"{filename}.tsv"),
+                os.path.join(_svg_dir, f"{filename}.svg"),
+                self._layout_cache.get(filename),
+                {
+                    "width" : 400,
+                    "colors" : "lightblue",
+                    "height" : 400,
+                    "vertex_size" : 50,
+                },
+            ))
+
+        for filename, layout in zip(self._leaf_communities_edgelist.keys(), self._emit_subgraphs(_jobs)):
+            self._layout_cache[filename] = layout
+    
+    def _write_property_plots(self, graph: igraph.Graph, _depth: str, _prop_plot__dir: str) -> None:
+        """
+        Writes the degree wise property csv files of a subgraph used for the property plots.
+        """
+        if graph.vcount() < 3:
+            # Figure this one out.
+            return
+            # return (-1,-1,-1,-1,-1,-1)
 
-            for filename, sub_graph_edgelist in self._leaf_communities_edgelist.items():
-                with open(os.path.join(__dir,f"{filename}.tsv"),"w") as f:
-                    for line in sub_graph_edgelist:
-                        f.write(f"{line[0]}\t{line[1]}\n")
+        # Reuse what the recursion already computed for this subgraph.
+        _properties = self._centrality_cache.pop(_depth, None)
+        if _properties is None:
+            _properties = self.compute_vertex_properties(graph)
 
+        _degrees = _properties["current_degree"]
+
+        for property_name in _PROPERTY_HEADINGS:
+            if property_name == "current_degree":
+                continue
+            _property = sorted ( [ [i,j] for i,j in zip(_degrees , _properties[property_name]) ] , key = lambda x:x[0] , reverse = False)
+            l = "index,value\n" + '\n'.join( [ f"{x},{y}" for x,y in _property ] )
+
+            with open(
+                os.path.join(_prop_plot__dir,f"{_depth}-{property_name}.csv"),
+                "w"
+                ) as f:
+                f.write(l)
 
-        for filename, sub_graph_edgelist in self._leaf_communities_edgelist.items():
-            
-            __dir = os.path.join(_dir, "leaf_nodes_svg_render")
-            
-            try:os.mkdir(__dir)
-            except FileExistsError:pass
-
-            svg_file_name  = os.path.join(__dir,f"{filename}.svg")
-            # self.communities_subgraph_inclusive[filename][0]["shape"] = 3
-            self.communities_subgraph_inclusive[filename].write_svg(
-                svg_file_name,
-                labels="_nx_name",
-                width=400,
-                colors="lightblue",
-                height=400,
-                vertex_size=50,
-                layout=igraph.Graph.layout_lgl(self.communities_subgraph_inclusive[filename]),
-            )
-    
     def write_subgraphs(self, base_dir : str , format : str = 'edgelist') -> None:
         # If no output type is specified then fallback to class default.
         if format is None:format = self.output_format
 
         _base_dir = os.path.join(base_dir, "subgraphs")
 
-        try:
-            os.mkdir(_base_dir)
-        except FileExistsError:
-            pass
+        os.makedirs(_base_dir, exist_ok=True)
 
         _prop_plot__dir = os.path.join(_base_dir, "prop_plots")
             
-        try:
-            os.mkdir(_prop_plot__dir)
-        except FileExistsError:
-            pass
+        os.makedirs(_prop_plot__dir, exist_ok=True)
         
-        # Add root node as well.
-        self.communities_subgraph_inclusive['0'] = self._graph
-
-        for _depth in self.communities_subgraph_inclusive.keys():
-            graph = self.communities_subgraph_inclusive[_depth]
-
-            vertice_count = len(graph.vs)
-            
-            if vertice_count < 3:
-                # Figure this one out.
-                continue
-                # return (-1,-1,-1,-1,-1,-1)
-
-            _degrees = graph.degree()
+        # The root node is written as well, under the name '0'.
+        _depths = ['0', *self._subgraph_vertex_sets.keys()]
 
+        _json_dir = os.path.join(_base_dir, "subgraphs_json")
+        os.makedirs(_json_dir, exist_ok=True)
 
-            _eigen_vector_centrality = [ i/(((vertice_count-1)*(vertice_count-2))/2) for i in graph.evcent()]
-            _eigen_vector_centrality = sorted ( [ [i,j] for i,j in zip(_degrees , _eigen_vector_centrality) ] , key = lambda x:x[0] , reverse = False)
-
-            _betweenness_centrality = [ i / ( ( (vertice_count-1)*(vertice_count-2) ) / 2 ) for i in graph.betweenness() ]
-            _betweenness_centrality = sorted ( [ [i,j] for i,j in zip(_degrees , _betweenness_centrality) ] , key = lambda x:x[0] , reverse = False)
+        _tsv_dir = None
+        if format == 'edgelist':
+            _tsv_dir = os.path.join(_base_dir, "subgraphs_tsv")
+            os.makedirs(_tsv_dir, exist_ok=True)
 
-            _closeness_centrality = graph.closeness()
-            _closeness_centrality = sorted ( [ [i,j] for i,j in zip(_degrees , _closeness_centrality) ] , key = lambda x:x[0] , reverse = False)
+        _svg_dir = os.path.join(_base_dir, "subgraphs_svg_render")
+        os.makedirs(_svg_dir, exist_ok=True)
 
-            
-            _p_degree_distribution = [ _degrees.count(i) / vertice_count for i in _degrees]
-            _p_degree_distribution = sorted ( [ [i,j] for i,j in zip(_degrees , _p_degree_distribution) ] , key = lambda x:x[0] , reverse = False)
-
-            _clustering_coeff = graph.transitivity_local_undirected()
-            _clustering_coeff = sorted ( [ [i,j] for i,j in zip(_degrees , _clustering_coeff) ] , key = lambda x:x[0] , reverse = False)
-
-            _neighborhood_connectivity = []
-            for vertex in graph.vs():
-                vid = vertex.index
-                neighbors = graph.neighbors(vid)
-                if len(neighbors) == 0:
-                    _neighborhood_connectivity.append(0)
-                    continue
-                _neighborhood_connectivity.append(sum( [graph.vs[_vid].degree() for _vid in neighbors ])/len(neighbors))
-            _neighborhood_connectivity = sorted ( [ [i,j] for i,j in zip(_degrees , _neighborhood_connectivity) ] , key = lambda x:x[0] , reverse = False)
-            
+        # JSON and SVG will always be rendered as they're used for displaying the interactive subgraphs.
+        _jobs = []
+        for _depth in _depths:
+            graph = self.get_subgraph(_depth)
+            self._write_property_plots(graph, _depth, _prop_plot__dir)
 
-            _prop_list = [
-                _eigen_vector_centrality,
-                _betweenness_centrality,
-                _closeness_centrality,
-                _p_degree_distribution,
-                _clustering_coeff,
-                _neighborhood_connectivity
-            ]
+            _l = graph.vcount()
+            dim = 30 * _l
 
-            
+            colors = [ "lightblue" if name in self._kr_set else "lightsalmon" for name in graph.vs['_nx_name'] ]
+
+            _jobs.append((
+                self._subgraph_vertex_ids(_depth),
+                os.path.join(_json_dir, f"{_depth}.json"),
+                None if _tsv_dir is None else os.path.join(_tsv_dir, f"{_depth}.tsv"),
+                os.path.join(_svg_dir, f"{_depth}.svg"),
+                self._layout_cache.get(_depth),
+                {
+                    "width" : dim if dim > 400 else 90 * _l,
+                    "colors" : colors,
+                    "height" : dim if dim > 400 else 90 * _l,
+                    "vertex_size" : 40,
+                },
+            ))
+
+        for _depth, layout in zip(_depths, self._emit_subgraphs(_jobs)):
+            self._layout_cache[_depth] = layout
+
+    def _emit_subgraphs(self, jobs: List[tuple]) -> List[List[List[float]]]:
+        """
+        Runs `_emit_subgraph` over the jobs, returning their layouts in order.
+        Every subgraph is written independently, so enough of them are spread
+        over a process pool which is kept for the next writer.
+        """
+        if len(jobs) < _MIN_POOL_JOBS:
+            _init_emit_worker(self._graph)
+            return [ _emit_subgraph(job) for job in jobs ]
+
+        # The jobs only carry vertex ids, the parent graph is sent to each worker once.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=min(_MAX_WRITE_WORKERS, os.cpu_count() or 1),
+                initializer=_init_emit_worker,
+                initargs=(self._graph,),
+            )
+        return list(self._executor.map(_emit_subgraph, jobs, chunksize=_MIN_POOL_JOBS))
 
-            for i in range(len(_prop_list)):
-                property_name = self._property_headings_list[i]
-                x_property_values = [x for x,_ in _prop_list[i]]
-                y_property_values = [y for _,y in _prop_list[i]]
+    def close(self) -> None:
+        """
+        Shuts down the process pool shared by the writers, if one was started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
 
-                l = '\n'.join(
-                    [
-                        f"{x_property_values[i]},{y_property_values[i]}" for i in range(len(x_property_values))
-                    ]
-                )
 
-                l = "index,value\n" + l
+# LGL gets slow on big graphs, past this many vertices a
+# Fruchterman-Reingold layout with capped iterations is used instead.
+_LGL_MAX_VERTICES = 1000
 
-                with open(
-                    os.path.join(_prop_plot__dir,f"{_depth}-{property_name}.csv"),
-                    "w"
-                    ) as f:
-                    f.write(l)
+# Parent graph the `_emit_subgraph` jobs cut their subgraphs out of, see `_init_emit_worker`.
+_emit_parent_graph: Optional[igraph.Graph] = None
 
-        if format == 'edgelist':
-            for _depth in self.communities_subgraph_inclusive.keys():
-                __dir = os.path.join(_base_dir, "subgraphs_tsv")
-                try:os.mkdir(__dir)
-                except FileExistsError:pass
-                _sg_edgelist = [ [  self.communities_subgraph_inclusive[_depth].vs[edge]['_nx_name'] for edge in line ] for line in self.communities_subgraph_inclusive[_depth].get_edgelist() ] 
-                with open(os.path.join(__dir,f"{_depth}.tsv"), "w") as f:
-                    for line in _sg_edgelist:
-                        f.write(f"{line[0]}\t{line[1]}\n")
-
-        # JSON will always be rendered as it's use for displaying the interactive subgraphs.
-        for _depth in self.communities_subgraph_inclusive.keys():
-            g_sub = nx.Graph( [ [ self.communities_subgraph_inclusive[_depth].vs[edge]['_nx_name'] for edge in pair ] for pair in  self.communities_subgraph_inclusive[_depth].get_edgelist()] )
-            json_data = json.dumps(json_graph.node_link_data(g_sub))
-            __dir = os.path.join(_base_dir, "subgraphs_json")
-            
-            try:
-                os.mkdir(__dir)
-            except FileExistsError:
-                pass
+def _init_emit_worker(graph: igraph.Graph) -> None:
+    global _emit_parent_graph
+    _emit_parent_graph = graph
 
-            json_file_obj = open(
-                os.path.join(__dir,f"{_depth}.json"),
-                "w"
-            )
-            json_file_obj.write(json_data)
-            json_file_obj.flush()
-            json_file_obj.close()
+def _emit_subgraph(job) -> List[List[float]]:
+    """
+    Writes the json, tsv edgelist (skipped if its path is None)
+    and svg render of a single subgraph, returns the layout
+    coordinates used so they can be reused, pass them back in
+    the job instead of None to skip computing the layout.
+    The subgraph is rebuilt here from its parent graph vertex ids
+    (None for the parent graph) and dropped once written.
+    Kept at module level so `ProcessPoolExecutor` can pickle it.
+    """
+    vertex_ids, json_file_name, tsv_file_name, svg_file_name, layout, svg_style = job
 
-        # SVG will always be rendered.
-        for _depth in self.communities_subgraph_inclusive.keys():
-            
-            __dir = os.path.join(_base_dir, "subgraphs_svg_render")
-            
-            try:os.mkdir(__dir)
-            except FileExistsError:pass
+    if vertex_ids is None:
+        graph = _emit_parent_graph
+    else:
+        graph = _emit_parent_graph.induced_subgraph(vertex_ids)
+
+    _edgelist = CommunityFinder._named_edgelist(graph)
+
+    # The node-link format `networkx.readwrite.json_graph.node_link_data` produced,
+    # built straight from the igraph graph.
+    _node_link = {
+        "directed" : False,
+        "multigraph" : False,
+        "graph" : {},
+        "nodes" : [ { "id" : name } for name in graph.vs["_nx_name"] ],
+        "links" : [ { "source" : source, "target" : target } for source, target in _edgelist ],
+    }
+
+    if orjson is not None:
+        with open(json_file_name, "wb") as f:
+            f.write(orjson.dumps(_node_link))
+    else:
+        with open(json_file_name, "w") as f:
+            f.write(json.dumps(_node_link))
 
-            svg_file_name  = os.path.join(__dir, f'{_depth}.svg')
-            _l = len(self.communities_subgraph_inclusive[_depth].vs)
-            dim = 30 * _l
+    if tsv_file_name is not None:
+        with open(tsv_file_name, "w") as f:
+            f.write("".join(f"{source}\t{target}\n" for source, target in _edgelist))
 
-            colors = [ "lightblue" if i['_nx_name'] in self.key_regulators.keys() else "lightsalmon" for i in self.communities_subgraph_inclusive[_depth].vs]
+    if layout is None:
+        if graph.vcount() > _LGL_MAX_VERTICES:
+            layout = graph.layout_fruchterman_reingold(niter=100).coords
+        else:
+            layout = igraph.Graph.layout_lgl(graph).coords
 
-            self.communities_subgraph_inclusive[_depth].write_svg(
-                svg_file_name,
-                labels="_nx_name",
-                width= dim if dim > 400 else 90 * _l,
-                colors=colors,
-                height= dim if dim > 400 else 90 * _l,
-                vertex_size=40,
-                layout=igraph.Graph.layout_lgl(self.communities_subgraph_inclusive[_depth]),
-            )
+    graph.write_svg(
+        svg_file_name,
+        labels="_nx_name",
+        layout=igraph.Layout(layout),
+        **svg_style,
+    )
+    return layout
 
 if __name__ == "__main__":
     # The input to this script are: 
     # network file , cf method , V(min) , number of key regs to trace , output file format , dir to write output to.
-    # cf_method => [louvain, leading_eigenvector]
+    # cf_method => [louvain, louvain_parallel, leading_eigenvector]
     if len(sys.argv) < 3:
         sys.stderr.write("Please provide filepath as first commandline arg and a directory to write the edgelist.")
 
         cf = CommunityFinder("/var/www/html/scheduler/test_data.tsv")#sys.argv[1])
 
-        leaf_communities = cf.parse()
+        leaf_communities = cf.parse(cache_properties=True)
         
         lc = cf._leaf_communities_edgelist
 
@@ -591,12 +748,12 @@ if __name__ == "__main__":
         with open("lib/knowledge_tree_1.json", "w") as fp:
             json.dump(tree__,fp , indent=4 , skipkeys=True)
 
-        community_subgraph_inclusive = cf.communities_subgraph_inclusive
-
         # cf.write_leaf_networks(base_dir="./tmp")
 
         cf.write_subgraphs(base_dir="./tmp")
 
+        cf.close()
+
 
         key_regs.clear()
     else:
@@ -617,12 +774,11 @@ if __name__ == "__main__":
             subgraph_min_vertices=int(cf_args[1]),
             key_regulator_bin_width=int(cf_args[2]),
             cf_algo=cf_args[0],
+            cache_properties=True,
             )
 
         lc = cf._leaf_communities_edgelist
 
-        community_subgraph_inclusive = cf.communities_subgraph_inclusive
-
         tree__ = cf.tree['root']
 
         with open(f"{output_dir.rstrip('/')}/tree.json", "w") as fp:
@@ -633,3 +789,5 @@ if __name__ == "__main__":
 
         cf.write_subgraphs(base_dir=output_dir , format= format)
 
+        cf.close()
+